@@ -99,6 +99,9 @@ class _DataPlayerBase:
 class DataPlayer(_DataPlayerBase):
     """Data player for pre-recorded data."""
 
+    # minimum time (seconds) between two seeks sent to the video player
+    VIDEO_SEEK_INTERVAL = 0.02
+
     def __init__(
             self,
             sonification: Union[Sonification, GroupSonification],
@@ -225,6 +228,11 @@ class DataPlayer(_DataPlayerBase):
         # used to decide the direction of the iteration
         rate_sign = int(self._rate / abs(self._rate))
 
+        # time when the last seek was sent to the video player
+        last_video_seek = 0
+        # video time of the last row, if it was not sent to the video player
+        pending_video_t = None
+
         # iterate over dataframe rows, from the current element on
         for ptr, row in self._df.iloc[start_ptr::rate_sign].iterrows():
 
@@ -250,7 +258,15 @@ class DataPlayer(_DataPlayerBase):
                 else:
                     t = row[self._time_label]
 
-                self._video_player.seek_time(t)
+                # rows can be faster than video frames: seeks are rate limited,
+                # the frame of the last row is sent when playback ends
+                now = time()
+                if now - last_video_seek >= self.VIDEO_SEEK_INTERVAL:
+                    self._video_player.seek_time(t)
+                    last_video_seek = now
+                    pending_video_t = None
+                else:
+                    pending_video_t = t
 
             # TODO: not thread safe
             # update pointer to current row
@@ -265,6 +281,10 @@ class DataPlayer(_DataPlayerBase):
             if waiting_time > 0:
                 sleep(waiting_time)
 
+        # display the frame of the last played row
+        if pending_video_t is not None:
+            self._video_player.seek_time(pending_video_t)
+
         # send stop bundle
         self._son.s.bundler().add(self._son.stop()).send()
 
@@ -435,13 +455,25 @@ class DataPlayer(_DataPlayerBase):
 
 
 class DataLogger:
-    """This class is used to handle logging of data from streams."""
+    """This class is used to handle logging of data from streams.
+
+    Rows are written in batches, through a large file buffer, to limit the
+    overhead of logging on the threads that feed the logger.
+    """
+
+    # number of rows written at once
+    BATCH_SIZE = 64
 
     def __init__(self):
         self.logging = False
         self._log_file = None
         self._writer = None
         self._first_line = False
+        # rows not yet passed to the writer
+        self._batch = []
+        # the logger is fed by the stream listener thread, while it is
+        # started and stopped from the kernel thread
+        self._lock = threading.Lock()
 
     def start(self, path: str, overwrite: bool):
         if self.logging:
@@ -452,21 +484,29 @@ class DataLogger:
                 raise FileExistsError(
                     f'{path} already exists. Use overwrite=True to overwrite it.')
 
-        self.logging = True
-        self._log_file = open(path, 'w')
-        self._writer = csv.writer(self._log_file)
-        self._first_line = True
+        log_file = open(path, 'w', newline='', buffering=1 << 20)
+
+        with self._lock:
+            self._log_file = log_file
+            self._writer = csv.writer(log_file)
+            self._first_line = True
+            self.logging = True
 
     def stop(self):
         if not self.logging:
             raise ValueError("Start logger first!")
 
-        self.logging = False
+        with self._lock:
+            self.logging = False
 
-        self._log_file.close()
-        self._log_file = None
+            # flush pending rows
+            self._writer.writerows(self._batch)
+            self._batch.clear()
 
-        self._writer = None
+            self._log_file.close()
+            self._log_file = None
+
+            self._writer = None
 
     def feed(self, row: pd.Series):
         """Feed data into the logger.
@@ -476,11 +516,23 @@ class DataLogger:
         if not self.logging:
             raise ValueError('Start logger first!')
 
-        if self._first_line:
-            self._writer.writerow(row.index)
-            self._first_line = False
+        # copy values: the row could be modified after being logged
+        values = row.tolist()
+
+        with self._lock:
+            if self._writer is None:
+                # the logger was stopped meanwhile
+                return
+
+            if self._first_line:
+                self._writer.writerow(row.index)
+                self._first_line = False
+
+            self._batch.append(values)
 
-        self._writer.writerow(row.array)
+            if len(self._batch) >= self.BATCH_SIZE:
+                self._writer.writerows(self._batch)
+                self._batch.clear()
 
 
 class _RTDataPlayerBase(_DataPlayerBase):
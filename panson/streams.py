@@ -309,6 +309,7 @@ class DummySin(Stream):
         yield np.array(header)
 
         t0 = time.time()
+        target_time = t0
 
         while True:
             t = time.time() - t0
@@ -317,10 +318,17 @@ class DummySin(Stream):
             if timestamps:
                 data.insert(0, t)
 
+            # the deadline of the next sample is absolute, so that the time
+            # spent by the consumer does not accumulate as drift
+            target_time += 1 / fps
+
             yield np.array(data)
 
-            # TODO: improve timing
-            time.sleep(1 / fps)
+            # if the consumer resumes the generator late, no sleep is performed
+            waiting_time = target_time - time.time()
+
+            if waiting_time > 0:
+                time.sleep(waiting_time)
 
 
 class DummySinCos(Stream):
@@ -337,6 +345,7 @@ class DummySinCos(Stream):
         yield np.array(header)
 
         t0 = time.time()
+        target_time = t0
 
         while True:
             t = time.time() - t0
@@ -346,10 +355,14 @@ class DummySinCos(Stream):
             if timestamps:
                 data.insert(0, t)
 
+            target_time += 1 / fps
+
             yield np.array(data)
 
-            # TODO: improve timing
-            time.sleep(1 / fps)
+            waiting_time = target_time - time.time()
+
+            if waiting_time > 0:
+                time.sleep(waiting_time)
 
 
 class NoneStream(Stream):
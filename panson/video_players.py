@@ -12,7 +12,6 @@ performed in other processes and commands are sent through pipes.
 The classes are meant to be used together with the data players.
 """
 
-import csv
 import time
 
 from PyQt5 import QtWidgets, QtCore
@@ -23,20 +22,135 @@ import pyqtgraph as pg
 
 import cv2
 
+import os
 import threading
+import queue
+import subprocess
 import sys
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import multiprocessing as mp
 import numpy as np
+import pandas as pd
 
 import pims
 
 import traceback
 
 
+# servers are not forked from the notebook kernel, which runs many threads:
+# the child could inherit locks held by them. The fork server process is
+# single threaded, and starts new servers faster than spawn
+_mp_context = mp.get_context(
+    'forkserver' if 'forkserver' in mp.get_all_start_methods() else None
+)
+# imported once by the fork server: the servers are forked with their
+# dependencies (PyQt5, pyqtgraph, pandas...) already loaded
+_mp_context.set_forkserver_preload(['panson.video_players'])
+
+
 class Communicate(QObject):
 
-    updateImg = pyqtSignal(np.ndarray)
+    # the new image is passed through a shared slot, not through the signal
+    updateImg = pyqtSignal()
+
+
+def _execute_command(commands: dict, cmd: tuple):
+    """Execute a command received through the pipe of a server.
+
+    Errors are printed, not raised, not to make the server crash.
+    """
+    try:
+        try:
+            command = commands[cmd[0]]
+        except KeyError:
+            raise ValueError(f"Unknown command {cmd[0]}") from None
+        command(*cmd[1:])
+    except:
+        # capture and print all exception not to make the server crash
+        traceback.print_exc()
+
+
+def _create_image_item(decim: int) -> pg.ImageItem:
+    """Return the item displaying the frames of a server, initially black.
+
+    :param decim: decimation factor of the displayed frames
+    """
+    # row-major order lets frames be displayed without transposing them
+    img = pg.ImageItem(axisOrder='row-major')
+    # decimated frames are already downsampled before being displayed
+    img.setAutoDownsample(decim == 1)
+    # frames are 8 bit: fixed levels avoid scanning every frame to
+    # compute them
+    img.setLevels((0, 255))
+    return img
+
+
+class _NvencWriter:
+    """Video writer encoding frames with NVENC through an ffmpeg process.
+
+    It exposes the subset of the cv2.VideoWriter interface used by the
+    recorder, so that the two can be used interchangeably.
+    """
+
+    def __init__(self, path: str, fps: float, frame_size: tuple):
+        width, height = frame_size
+        self._proc = subprocess.Popen(
+            [
+                'ffmpeg', '-loglevel', 'error', '-y',
+                # raw frames from stdin
+                '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+                '-s', f'{width}x{height}', '-r', str(fps),
+                '-i', '-',
+                # low latency hardware encoding
+                '-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'll',
+                '-rc', 'vbr', '-cq', '23',
+                path
+            ],
+            stdin=subprocess.PIPE
+        )
+
+    # result of the NVENC probe, computed once
+    _available = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Check whether NVENC encoding works on this machine.
+
+        ffmpeg builds may list h264_nvenc even without an NVIDIA GPU: a
+        frame is actually encoded to find out.
+        """
+        if cls._available is None:
+            try:
+                cls._available = subprocess.run(
+                    [
+                        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                        '-f', 'lavfi', '-i', 'nullsrc=s=256x256',
+                        '-c:v', 'h264_nvenc', '-frames:v', '1',
+                        '-f', 'null', '-'
+                    ],
+                    capture_output=True, timeout=10
+                ).returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                cls._available = False
+        return cls._available
+
+    def isOpened(self) -> bool:
+        return self._proc.poll() is None
+
+    def write(self, frame: np.ndarray):
+        # frames are C-contiguous: write them without copies
+        self._proc.stdin.write(frame.data)
+
+    def release(self):
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg already terminated
+            pass
+        self._proc.wait()
 
 
 # TODO: refactor video players inheriting from QMainWindow
@@ -54,7 +168,9 @@ class VideoPlayerServer:
             file_path: str,
             frame_times_path: str = None,
             fps=None,
-            on_top: bool = True
+            on_top: bool = True,
+            cache_mb: float = 128,
+            decim: int = 1
     ):
         """
         :param conn: pipe end used for communication
@@ -65,13 +181,23 @@ class VideoPlayerServer:
         :param fps: static fps value
             considered if frame times is not available
         :param on_top: wether to display the player window as "always on top"
+        :param cache_mb: memory used to keep decoded frames (MB)
+            e.g. 128 MB hold about 20 RGB frames at 1080p, 80 with decim=2.
+            Frames around the displayed one are decoded in advance to fill
+            half of it
+        :param decim: decimation factor of the displayed frames
         """
+        if decim < 1:
+            raise ValueError(f"decim ({decim}) must be >= 1.")
+
         # pipe end
         self._conn = conn
 
         self._file_path = file_path
         # TODO: Video is the correct class to use?
         self._video = pims.Video(file_path)
+        # some backends compute the length by walking the container index
+        self._n_frames = len(self._video)
 
         if frame_times_path is None:
             print('No frame times specified')
@@ -84,9 +210,9 @@ class VideoPlayerServer:
                 print(f'Loading default frame times from {frame_times_path}')
 
                 try:
-                    self._frame_times = np.loadtxt(frame_times_path, delimiter=',')
+                    self._frame_times = self._load_frame_times(frame_times_path)
                     print('Frame times loaded.')
-                except OSError:
+                except (OSError, ValueError):
                     print('No default frame times found: seek_time will not work.')
                     self._frame_times = None
 
@@ -96,14 +222,46 @@ class VideoPlayerServer:
                 self._frame_times = None
         else:
             print(f'Loading frame times from {frame_times_path}')
-            self._frame_times = np.loadtxt(frame_times_path)
+            self._frame_times = self._load_frame_times(frame_times_path)
             if fps:
                 print(f'Ignoring specified fps {fps}')
                 self._fps = None
 
+        # LRU cache of decoded frames, indexed by frame number
+        # seeking back and forth around the same position is frequent when
+        # navigating the data
+        self._frame_cache = OrderedDict()
+        # serializes cache accesses and decoding between seek and prefetch
+        self._frame_cache_lock = threading.Lock()
+
+        # frames are decimated once, when decoded, so that the cache and the
+        # GUI thread handle the smaller frames
+        self._decim = decim
+
+        # number of frames fitting in the cache
+        height, width, *channels = self._video.frame_shape
+        frame_bytes = (height // decim) * (width // decim) * (channels[0] if channels else 1)
+        self._cache_size = max(int(cache_mb * 2 ** 20) // max(frame_bytes, 1), 2)
+
+        # worker that decodes the frames around the last seek in advance
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1)
+
+        # commands that can be received through the pipe
+        self._commands = {
+            'seek': self.seek,
+            'seek_time': self.seek_time,
+            'quit': self.quit
+        }
+
         # threads
         self._receiver_thread = threading.Thread(target=self._receiver)
 
+        # newest frame to be displayed
+        # when seeks come faster than the GUI can display them, the pending
+        # signals find the slot empty and intermediate frames are dropped
+        self._latest_frame = None
+        self._latest_frame_lock = threading.Lock()
+
         self.c = Communicate()
         self.c.updateImg.connect(self._update_img)
 
@@ -119,9 +277,10 @@ class VideoPlayerServer:
         if on_top:
             self._win.setWindowFlag(QtCore.Qt.WindowStaysOnTopHint)
 
-        # black image
-        self._img = pg.ImageItem()
-        self._img.setAutoDownsample(True)
+        self._img = _create_image_item(decim)
+        # keep the rendered frame in a pixmap: repaints that are not caused
+        # by a new frame do not rasterize it again
+        self._img.setCacheMode(QtWidgets.QGraphicsItem.DeviceCoordinateCache)
 
         self._img_gv = pg.GraphicsView()
         self._view_box = pg.ViewBox()
@@ -139,18 +298,111 @@ class VideoPlayerServer:
 
         # set first frame
         self._curr_frame_idx = 0
-        self._img.setImage(self._video[self._curr_frame_idx].swapaxes(0, 1))
+        self._img.setImage(self._get_frame(self._curr_frame_idx), autoLevels=False)
 
         self._win.show()
 
-    def _update_img(self, img):
+    @staticmethod
+    def _load_frame_times(path: str) -> np.ndarray:
+        """Load frame timestamps from a file, as written by RTVideoPlayer.
+
+        The file has two columns: frame number and timestamp. Values are
+        separated by commas or whitespace, and there may be a header.
+
+        :return: contiguous array of timestamps
+            seek_time performs a binary search on it at every call
+        :raises ValueError: if the file contains no timestamps
+        """
+        # the format is inferred from the first line, so that the columns are
+        # parsed directly as numbers
+        with open(path) as f:
+            first_line = f.readline()
+
+        sep = ',' if ',' in first_line else r'\s+'
+        fields = first_line.replace(',', ' ').split()
+        try:
+            float(fields[1])
+            header = None
+        except ValueError:
+            header = 0
+        except IndexError:
+            raise ValueError(f"No frame times in {path}") from None
+
+        # the C parser is much faster than np.loadtxt on long recordings
+        try:
+            timestamps = pd.read_csv(
+                path,
+                sep=sep,
+                header=header,
+                usecols=[1],
+                dtype='float64',
+                engine='c'
+            ).iloc[:, 0]
+        except pd.errors.EmptyDataError:
+            raise ValueError(f"No frame times in {path}") from None
+
+        if timestamps.empty:
+            raise ValueError(f"No frame times in {path}")
+
+        return np.ascontiguousarray(timestamps.to_numpy())
+
+    def _get_frame(self, idx: int) -> np.ndarray:
+        """Return the frame of index idx, ready to be displayed."""
+        with self._frame_cache_lock:
+            try:
+                frame = self._frame_cache[idx]
+                self._frame_cache.move_to_end(idx)
+            except KeyError:
+                frame = self._video[idx]
+                if self._decim > 1:
+                    frame = cv2.resize(
+                        frame,
+                        None,
+                        fx=1 / self._decim,
+                        fy=1 / self._decim,
+                        interpolation=cv2.INTER_AREA
+                    )
+                self._frame_cache[idx] = frame
+
+                if len(self._frame_cache) > self._cache_size:
+                    # evict least recently used frame
+                    self._frame_cache.popitem(last=False)
+
+        return frame
+
+    def _prefetch(self, idx: int):
+        """Decode the frames around idx and store them in the cache.
+
+        Frames are decoded in both directions, in increasing order: the
+        backend keeps decoding from the previous frame instead of seeking to
+        a keyframe for every frame. The frames after idx come first. The
+        window covers half of the cache, so that it does not evict itself.
+        """
+        radius = max(self._cache_size // 4, 1)
+
+        forward = range(idx + 1, min(idx + radius + 1, self._n_frames))
+        backward = range(max(idx - radius, 0), idx)
+
+        for run in (forward, backward):
+            for i in run:
+                if idx != self._curr_frame_idx:
+                    # a newer seek was issued
+                    return
+                self._get_frame(i)
+
+    def _update_img(self):
         """Update displayed image.
 
         The image must be updated only in the thread where is was originally
         created. For this reason this method is only called when triggered by
         an updateImg signal.
         """
-        self._img.setImage(img)
+        with self._latest_frame_lock:
+            img = self._latest_frame
+            self._latest_frame = None
+
+        if img is not None:
+            self._img.setImage(img, autoLevels=False)
 
     def start(self):
         """Start reception of commands."""
@@ -161,45 +413,63 @@ class VideoPlayerServer:
         while self._running:
             cmd = self._conn.recv()
 
-            try:
-                self.__getattribute__(cmd[0])(*cmd[1:])
-            except:
-                # capture and print all exception not to make the server crash
-                traceback.print_exc()
+            # when seeks arrive faster than frames can be decoded, only the
+            # last one of a sequence of queued seeks is executed
+            while cmd[0] in self._seek_commands and self._conn.poll():
+                next_cmd = self._conn.recv()
+                if next_cmd[0] not in self._seek_commands:
+                    self._execute(cmd)
+                cmd = next_cmd
+
+            self._execute(cmd)
 
         # end main loop
         self.app.exit()
 
+    # commands whose effect is overridden by a following seek
+    _seek_commands = ('seek', 'seek_time')
+
+    def _execute(self, cmd):
+        _execute_command(self._commands, cmd)
+
     # COMMANDS
 
     def seek(self, idx: int):
 
         # print('s', idx)
 
-        if not (0 <= idx < len(self._video)):
+        if not (0 <= idx < self._n_frames):
             raise ValueError(
-                f"idx ({idx}) must be between 0 and {len(self._video)}"
+                f"idx ({idx}) must be between 0 and {self._n_frames}"
             )
 
         if idx == self._curr_frame_idx:
             return
 
-        frame = self._video[idx]
-        self.c.updateImg.emit(frame.swapaxes(0, 1))
+        frame = self._get_frame(idx)
+        with self._latest_frame_lock:
+            self._latest_frame = frame
+        self.c.updateImg.emit()
 
         self._curr_frame_idx = idx
 
+        # the next seeks will likely be close to this one
+        self._prefetch_pool.submit(self._prefetch, idx)
+
     def seek_time(self, t: float):
         if self._frame_times is not None:
-            max_time = self._frame_times[-1, 1]
+            max_time = self._frame_times[-1]
             if t > max_time:
                 raise ValueError(
                     f"t == {t} is greater than maximum time {max_time}"
                 )
             # find timestamp with binary search
-            idx = np.searchsorted(self._frame_times[:, 1], t)
+            idx = int(np.searchsorted(self._frame_times, t))
+            # pick the closer of the two neighbouring frames
+            if idx > 0 and t - self._frame_times[idx - 1] < self._frame_times[idx] - t:
+                idx -= 1
         elif self._fps is not None:
-            max_time = len(self._video) / self._fps
+            max_time = self._n_frames / self._fps
             if t > max_time:
                 raise ValueError(
                     f"t == {t} is greater than maximum time {max_time}"
@@ -215,17 +485,24 @@ class VideoPlayerServer:
     def quit(self):
         self._running = False
         self._conn.close()
+        self._prefetch_pool.shutdown(wait=False, cancel_futures=True)
 
 
 class VideoPlayer:
-    """This class is a proxy for the VideoPlayerServer class."""
+    """This class is a proxy for the VideoPlayerServer class.
+
+    The server runs in a process that is not forked from the caller: in
+    scripts, players must be created under ``if __name__ == '__main__':``.
+    """
 
     def __init__(
             self,
             file_path: str,
             frame_times_path: str = None,
             fps=None,
-            on_top: bool = True
+            on_top: bool = True,
+            cache_mb: float = 128,
+            decim: int = 1
     ):
         """
         :param file_path: video file
@@ -235,11 +512,22 @@ class VideoPlayer:
         :param fps: static fps value
             considered if frame times is not available
         :param on_top: wether to display the player window as "always on top"
+        :param cache_mb: memory used to keep decoded frames (MB)
+            e.g. 128 MB hold about 20 RGB frames at 1080p, 80 with decim=2.
+            Frames around the displayed one are decoded in advance to fill
+            half of it
+        :param decim: decimation factor of the displayed frames
         """
-        self._conn, child_conn = mp.Pipe()
-        p = mp.Process(
+        # commands only flow towards the server: a one-way pipe is enough
+        child_conn, self._conn = _mp_context.Pipe(duplex=False)
+        p = _mp_context.Process(
             target=self._server_main,
-            args=(child_conn, file_path, frame_times_path, fps, on_top),
+            args=(
+                child_conn, file_path, frame_times_path, fps, on_top,
+                cache_mb, decim
+            ),
+            # the window is closed if the parent terminates
+            daemon=True
         )
 
         # start server process
@@ -286,7 +574,13 @@ class RTVideoPlayerServer:
             height: int = None,
             fps: int = None,
             enumerate_records: bool = True,
-            on_top: bool = True
+            on_top: bool = True,
+            decim: int = 1,
+            codec: str = 'XVID',
+            display_fps: float = 30,
+            encoder: str = 'opencv',
+            capture_fourcc: str = None,
+            cpu_affinity: int = None
     ):
         """
         :param conn: pipe end used for communication
@@ -299,16 +593,61 @@ class RTVideoPlayerServer:
             if not available, a valid value will be set
         :param enumerate_records: auto enumeration of recording files
         :param on_top: wether to display the player window as "always on top"
+        :param decim: decimation factor of the displayed frames
+            recordings are always performed at full resolution
+        :param codec: fourcc code of the codec used for recordings
+            e.g. 'MJPG' is cheaper to encode, 'avc1' may be hardware
+            accelerated. If not available, 'XVID' will be used
+        :param display_fps: maximum frame rate of the preview
+            recordings are always performed at the capture frame rate
+        :param encoder: 'opencv' or 'nvenc'
+            'nvenc' encodes recordings in H.264 on NVIDIA GPUs through ffmpeg,
+            ignoring codec. If not available, 'opencv' will be used
+        :param capture_fourcc: pixel format requested to the device
+            e.g. 'MJPG' lets many USB cameras deliver higher resolutions and
+            frame rates
+        :param cpu_affinity: CPU core the capture thread is pinned to
+            if not None, the thread is also given real-time priority, when
+            permitted (Linux only)
         """
+        if decim < 1:
+            raise ValueError(f"decim ({decim}) must be >= 1.")
+        if not (0 < display_fps <= 1000):
+            # the display timer has a resolution of one millisecond
+            raise ValueError(f"display_fps ({display_fps}) must be > 0 and <= 1000.")
+        if encoder not in ('opencv', 'nvenc'):
+            raise ValueError(f"encoder ({encoder}) must be 'opencv' or 'nvenc'.")
+
         # pipe end
         self._conn = conn
 
+        # commands that can be received through the pipe
+        self._commands = {
+            'filename': self.filename,
+            'autoenum': self.autoenum,
+            'record': self.record,
+            'stop': self.stop,
+            'quit': self.quit
+        }
+
         # threads
         self._receiver_thread = threading.Thread(target=self._receiver)
-        self._recorder_thread = threading.Thread(target=self._recorder)
-
-        self.c = Communicate()
-        self.c.updateImg.connect(self._update_img)
+        # recorder pipeline: capture -> process (preview) -> write
+        self._capture_thread = threading.Thread(target=self._capture_loop)
+        self._process_thread = threading.Thread(target=self._process_loop)
+        self._write_thread = threading.Thread(target=self._write_loop)
+
+        # bounded queues connecting the stages of the pipeline
+        # a None item signals the end of the stream to the next stage
+        self._read_queue = queue.Queue(maxsize=4)
+        # larger, to absorb file system stalls while recording
+        self._write_queue = queue.Queue(maxsize=16)
+
+        # newest frame to be displayed
+        # the GUI thread polls it, so that frames that it could not display
+        # in time are dropped instead of being queued
+        self._latest_frame = None
+        self._latest_frame_lock = threading.Lock()
 
         # playback running
         self._running = False
@@ -318,15 +657,22 @@ class RTVideoPlayerServer:
         self._out_file_suffix = 'avi'
 
         self._device_id = device
+        self._cpu_affinity = cpu_affinity
 
         # Recorder
+        # set when the process stage has to forward frames to the write stage
         self._recording = False
-        # recorder's start time
+        # recorder's start time, in nanoseconds of the monotonic clock
         self._t0 = None
         self._enumerate_records = enumerate_records
         self._run_counter = 0
         self._frame_counter = None
-        self._frametimes = None
+        # frames discarded because the write stage was lagging behind
+        self._dropped_frames = 0
+        # timestamps of the recorded frames (ns), saved when the recording
+        # stops. The array is preallocated and grown geometrically
+        self._frame_times = None
+        # file being recorded, owned by the write stage
         self._fname = None
 
         # GUI
@@ -334,9 +680,7 @@ class RTVideoPlayerServer:
         self._win = QtWidgets.QMainWindow()
         self._win.setWindowTitle(f'Camera: device {device}')
 
-        # black image
-        self._img = pg.ImageItem()
-        self._img.setAutoDownsample(True)
+        self._img = _create_image_item(decim)
 
         self._img_gv = pg.GraphicsView()
         self._view_box = pg.ViewBox()
@@ -353,13 +697,36 @@ class RTVideoPlayerServer:
         if on_top:
             self._win.setWindowFlag(QtCore.Qt.WindowStaysOnTopHint)
 
-        self._fourcc = cv2.VideoWriter_fourcc(*'XVID')
+        self._fourcc = cv2.VideoWriter_fourcc(*codec)
+
+        self._nvenc = encoder == 'nvenc'
+        if self._nvenc and not _NvencWriter.available():
+            print("NVENC not available: falling back to OpenCV encoder")
+            self._nvenc = False
         self._writer: cv2.VideoWriter = None
 
         # capture device
-        self._capture = cv2.VideoCapture(self._device_id)
+        # prefer the native backends, that support small buffer sizes
+        if sys.platform.startswith('linux'):
+            api = cv2.CAP_V4L2
+        elif sys.platform == 'win32':
+            api = cv2.CAP_DSHOW
+        else:
+            api = cv2.CAP_ANY
+        self._capture = cv2.VideoCapture(self._device_id, api)
+        if not self._capture.isOpened():
+            self._capture = cv2.VideoCapture(self._device_id)
+
+        # do not let the backend queue frames: read() must return the newest
+        # one, for a lower latency and more accurate timestamps
+        if not self._capture.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+            print("Cannot set capture buffer size: the preview may lag")
 
         # try to set parameters specified by the user
+        if capture_fourcc:
+            self._capture.set(
+                cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*capture_fourcc)
+            )
         if width:
             self._capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
         if height:
@@ -374,82 +741,319 @@ class RTVideoPlayerServer:
 
         print(f"{self._width} x {self._height} @ {self._fps} fps")
 
+        # pool of capture buffers where frames are decoded
+        # the stage that uses a frame last gives its buffer back to the pool
+        # there is a buffer for every queue slot and one for every stage
+        # last in, first out: in steady state the same few buffers are
+        # reused while still in cache, the others only absorb backlogs
+        self._free_frame_bufs = queue.LifoQueue()
+        for _ in range(self._read_queue.maxsize + self._write_queue.maxsize + 3):
+            self._free_frame_bufs.put(
+                np.empty((self._height, self._width, 3), dtype=np.uint8)
+            )
+
+        # minimum time between two displayed frames
+        # in nanoseconds, as the frame timestamps
+        self._display_interval = int(1e9 / display_fps)
+
+        # size of the displayed frames
+        self._decim = decim
+        self._disp_width = self._width // decim
+        self._disp_height = self._height // decim
+
+        # buffer for the decimated frames
+        self._disp_buf = np.empty((self._disp_height, self._disp_width, 3), dtype=np.uint8)
+
+        # preview buffers, reused cyclically for the RGB conversion of frames
+        # more than one buffer is needed because the GUI thread displays them
+        # asynchronously
+        self._rgb_bufs = [
+            np.empty((self._disp_height, self._disp_width, 3), dtype=np.uint8)
+            for _ in range(3)
+        ]
+
+        # display timer, running in the GUI thread
+        self._display_timer = QtCore.QTimer()
+        self._display_timer.timeout.connect(self._update_img)
+
         # TODO: relative window position
         self._win.setGeometry(1000, 0, self._width, self._height)
         self._win.show()
 
-    def _update_img(self, img):
-        self._img.setImage(img)
+    def _update_img(self):
+        """Display the newest frame, if any."""
+        with self._latest_frame_lock:
+            img = self._latest_frame
+            self._latest_frame = None
+
+        if img is not None:
+            self._img.setImage(img, autoLevels=False)
 
     def start(self):
         self._running = True
+        self._display_timer.start(self._display_interval // 1_000_000)
         self._receiver_thread.start()
-        self._recorder_thread.start()
+        self._capture_thread.start()
+        self._process_thread.start()
+        self._write_thread.start()
 
     def _receiver(self):
         while self._running:
             cmd = self._conn.recv()
+            _execute_command(self._commands, cmd)
 
-            try:
-                self.__getattribute__(cmd[0])(*cmd[1:])
-            except:
-                # capture and print all exception not to make the server crash
-                traceback.print_exc()
+    def _set_capture_priority(self):
+        """Pin the calling thread to the chosen core, with real-time priority.
 
-    def _recorder(self):
+        The capture thread is then not preempted by the other threads,
+        which reduces the jitter of the frame timestamps.
+        """
+        if self._cpu_affinity is None:
+            return
 
-        while self._running:
-            grabbed, frame = self._capture.read()
-            t = time.time()
+        if not hasattr(os, 'sched_setaffinity'):
+            print("CPU affinity is not supported on this platform")
+            return
 
-            if not grabbed:
-                print("Can't receive frame (stream end?). Exiting ...")
-                self._running = False
-                break
+        # pid 0 refers to the calling thread
+        try:
+            os.sched_setaffinity(0, {self._cpu_affinity})
+        except OSError as e:
+            print(f"Cannot set CPU affinity of the capture thread: {e}")
+
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(50))
+        except PermissionError:
+            print("Not permitted to set real-time priority of the capture thread")
+
+    def _capture_loop(self):
+        """First stage of the recorder: fetch frames from the device."""
+        self._set_capture_priority()
+
+        # local references avoid attribute lookups in the loop
+        get_buf = self._free_frame_bufs.get
+        grab = self._capture.grab
+        retrieve = self._capture.retrieve
+        put = self._read_queue.put
+        # monotonic clock: immune to system clock adjustments
+        now = time.monotonic_ns
+
+        try:
+            while self._running:
+                # blocks if all the buffers are in use by the following stages
+                buf = get_buf()
+
+                grabbed = grab()
+                t = now()
+
+                if grabbed:
+                    # decode into the buffer
+                    # if the buffer does not fit the frame, a new one is
+                    # allocated and it will take the place of the old one in
+                    # the pool
+                    grabbed, frame = retrieve(buf)
+
+                if not grabbed:
+                    print("Can't receive frame (stream end?). Exiting ...")
+                    self._running = False
+                    break
+
+                # blocks if the following stages are lagging behind
+                put((t, frame))
+        finally:
+            # let the following stages terminate even in case of errors
+            self._read_queue.put(None)
+
+            self._capture.release()
+            print("Release capture")
+
+    def _process_loop(self):
+        """Second stage of the recorder: display frames."""
+        # local references avoid attribute lookups in the loop
+        get = self._read_queue.get
+        put = self._write_queue.put
+        put_nowait = self._write_queue.put_nowait
+        put_buf = self._free_frame_bufs.put
+        latest_frame_lock = self._latest_frame_lock
+        decimate = self._decim > 1
+        disp_size = (self._disp_width, self._disp_height)
+        disp_buf = self._disp_buf
+        rgb_bufs = self._rgb_bufs
+        display_interval = self._display_interval
+
+        buf_idx = 0
+        # time of the last frame sent to the preview
+        last_display = 0
+
+        try:
+            while True:
+                item = get()
+
+                if item is None:
+                    break
+
+                t, frame = item
+
+                # errors must not stop the stage: the capture would block on
+                # the queue, and buffers would not return to the pool
+                try:
+                    # skip the conversion of frames that would not be displayed
+                    if t - last_display >= display_interval:
+                        last_display = t
+
+                        if decimate:
+                            disp = cv2.resize(
+                                frame,
+                                disp_size,
+                                dst=disp_buf,
+                                # averaging pixels avoids aliasing
+                                interpolation=cv2.INTER_AREA
+                            )
+                        else:
+                            disp = frame
+
+                        rgb = cv2.cvtColor(disp, cv2.COLOR_BGR2RGB, dst=rgb_bufs[buf_idx])
+                        buf_idx = (buf_idx + 1) % len(rgb_bufs)
+
+                        with latest_frame_lock:
+                            self._latest_frame = rgb
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    if self._recording:
+                        try:
+                            # never block the capture on a slow disk
+                            put_nowait(('write', t, frame))
+                        except queue.Full:
+                            self._dropped_frames += 1
+                            put_buf(frame)
+                    else:
+                        put_buf(frame)
+        finally:
+            # let the write stage terminate even in case of errors
+            put(None)
+
+    def _write_loop(self):
+        """Last stage of the recorder: encode frames and log their timestamps.
+
+        Encoding in a separate thread lets the capture of the next frames
+        overlap with the encoding of the current one.
+
+        Start and stop of the recordings are received through the same queue
+        of the frames, so that the frames queued before a stop are written
+        before closing the file.
+        """
+        while True:
+            item = self._write_queue.get()
 
-            self.c.updateImg.emit(frame[:, :, (2, 1, 0)].swapaxes(0, 1))
+            if item is None:
+                break
 
-            if self._recording:
-                # log video frame
-                self._writer.write(frame)
-                # log timestamp
-                self._log_writer.writerow([self._frame_counter, t - self._t0])
-                self._frame_counter += 1
+            # errors must not stop the stage: the others would block on the
+            # queue, and buffers would not return to the pool
+            if item[0] == 'write':
+                _, t, frame = item
 
-        if self._recording:
-            self._stop_recording()
+                try:
+                    # the writer is None for frames that were forwarded while
+                    # a stop command was being issued, or after a failure
+                    if self._writer is not None:
+                        # log video frame
+                        self._writer.write(frame)
+
+                        # log timestamp
+                        if self._frame_counter == len(self._frame_times):
+                            self._frame_times = np.concatenate(
+                                (self._frame_times, np.empty_like(self._frame_times))
+                            )
+                        self._frame_times[self._frame_counter] = t - self._t0
+                        self._frame_counter += 1
+                except Exception:
+                    traceback.print_exc()
+                    print("Cannot write frame: stopping recording")
+                    self._recording = False
+                    self._stop_recording()
+                finally:
+                    self._free_frame_bufs.put(frame)
+            else:
+                try:
+                    if item[0] == 'record':
+                        self._start_recording(*item[1:])
+                    elif item[0] == 'stop':
+                        self._stop_recording()
+                except Exception:
+                    traceback.print_exc()
 
-        self._capture.release()
-        print("Release capture")
+        self._recording = False
+        self._stop_recording()
 
         # end main loop
         self.app.exit()
 
-    def _start_recording(self, t_start):
-        if self._enumerate_records:
-            self._fname = "%s-%03d.%s" % (self._out_file_prefix, self._run_counter, self._out_file_suffix)
-            self._run_counter += 1
+    def _start_recording(self, t_start, fname: str):
+        # never drop an open writer without releasing it
+        self._stop_recording()
+
+        self._fname = fname
+
+        if self._nvenc:
+            self._writer = _NvencWriter(
+                self._fname, self._fps, (self._width, self._height)
+            )
         else:
-            self._fname = self._out_file_prefix + "." + self._out_file_suffix
+            self._writer = cv2.VideoWriter(
+                self._fname, self._fourcc, self._fps, (self._width, self._height)
+            )
 
-        self._writer = cv2.VideoWriter(
-            self._fname, self._fourcc, self._fps, (self._width, self._height)
-        )
+        if not self._writer.isOpened():
+            print("Codec not available: falling back to XVID")
+            self._writer.release()
+            self._fourcc = cv2.VideoWriter_fourcc(*'XVID')
+            self._writer = cv2.VideoWriter(
+                self._fname, self._fourcc, self._fps, (self._width, self._height)
+            )
 
-        self._log_file = open(f"{self._fname}.csv", 'w')
-        # TODO: add float format precision?
-        self._log_writer = csv.writer(self._log_file)
-        # write header
-        self._log_writer.writerow(['frame_number', 'timestamp'])
+        # room for one minute of recording
+        self._frame_times = np.empty(max(int(self._fps * 60), 4096), dtype=np.int64)
 
         self._frame_counter = 0
-        self._t0 = t_start
+        self._dropped_frames = 0
+        # t_start comes from the wall clock of the data player: convert it
+        # into the monotonic clock used for the frame timestamps
+        self._t0 = time.monotonic_ns() - int((time.time() - t_start) * 1e9)
 
     def _stop_recording(self):
-        self._writer.release()
+        if self._writer is None:
+            return
+
+        try:
+            self._writer.release()
+        except Exception:
+            traceback.print_exc()
+        # drop the reference to free the encoder context
+        self._writer = None
         print("Release writer")
 
-        self._log_file.close()
+        if self._dropped_frames:
+            print(f"{self._dropped_frames} frames dropped while recording")
+
+        # save frame times in the background, not to stall the write stage
+        # the thread is not a daemon: the process waits for it before exiting
+        threading.Thread(
+            target=self._save_frame_times,
+            args=(f"{self._fname}.csv", self._frame_times[:self._frame_counter])
+        ).start()
+        self._frame_times = None
+
+    @staticmethod
+    def _save_frame_times(path: str, frame_times: np.ndarray):
+        """Save frame timestamps (ns) in a csv file, in seconds."""
+        # pandas writes the whole file in C, while np.savetxt formats every
+        # value in python
+        pd.DataFrame({
+            'frame_number': np.arange(len(frame_times)),
+            'timestamp': frame_times / 1e9
+        }).to_csv(path, index=False)
 
     # COMMANDS
 
@@ -470,22 +1074,40 @@ class RTVideoPlayerServer:
         :param t_start: reference timestamp
             used to synchronize logs and recordings
         """
-        self._start_recording(t_start)
+        # the file name is decided here and travels with the command: the
+        # previous recording may still be draining in the write stage
+        if self._enumerate_records:
+            fname = "%s-%03d.%s" % (self._out_file_prefix, self._run_counter, self._out_file_suffix)
+            self._run_counter += 1
+        else:
+            fname = self._out_file_prefix + "." + self._out_file_suffix
+
+        # the writer is opened before any frame is forwarded to it
+        self._write_queue.put(('record', t_start, fname))
         self._recording = True
 
     def stop(self):
         """Stop recorder."""
-        self._stop_recording()
-        # cancel recording - will let thread run come to an end
         self._recording = False
+        # the frames already queued will be written before closing the writer
+        self._write_queue.put(('stop',))
 
     def quit(self):
         self._running = False
         self._conn.close()
 
+        # wait for the recorder pipeline to be drained
+        self._capture_thread.join()
+        self._process_thread.join()
+        self._write_thread.join()
+
 
 class RTVideoPlayer:
-    """This class is a proxy for the RTVideoPlayerServer class."""
+    """This class is a proxy for the RTVideoPlayerServer class.
+
+    The server runs in a process that is not forked from the caller: in
+    scripts, players must be created under ``if __name__ == '__main__':``.
+    """
 
     def __init__(
             self,
@@ -494,7 +1116,13 @@ class RTVideoPlayer:
             height: int = None,
             fps: int = None,
             enumerate_records: bool = True,
-            on_top: bool = True
+            on_top: bool = True,
+            decim: int = 1,
+            codec: str = 'XVID',
+            display_fps: float = 30,
+            encoder: str = 'opencv',
+            capture_fourcc: str = None,
+            cpu_affinity: int = None
     ):
         """
         :param device: number of the device to be opened
@@ -506,11 +1134,34 @@ class RTVideoPlayer:
             if not available, a valid value will be set
         :param enumerate_records: auto enumeration of recording files
         :param on_top: wether to display the player window as "always on top"
+        :param decim: decimation factor of the displayed frames
+            recordings are always performed at full resolution
+        :param codec: fourcc code of the codec used for recordings
+            e.g. 'MJPG' is cheaper to encode, 'avc1' may be hardware
+            accelerated. If not available, 'XVID' will be used
+        :param display_fps: maximum frame rate of the preview
+            recordings are always performed at the capture frame rate
+        :param encoder: 'opencv' or 'nvenc'
+            'nvenc' encodes recordings in H.264 on NVIDIA GPUs through ffmpeg,
+            ignoring codec. If not available, 'opencv' will be used
+        :param capture_fourcc: pixel format requested to the device
+            e.g. 'MJPG' lets many USB cameras deliver higher resolutions and
+            frame rates
+        :param cpu_affinity: CPU core the capture thread is pinned to
+            if not None, the thread is also given real-time priority, when
+            permitted (Linux only)
         """
-        self._conn, child_conn = mp.Pipe()
-        p = mp.Process(
+        # commands only flow towards the server: a one-way pipe is enough
+        child_conn, self._conn = _mp_context.Pipe(duplex=False)
+        # not daemonic: on exit, the parent must not kill the server while
+        # it is finalizing a recording
+        p = _mp_context.Process(
             target=self._server_main,
-            args=(child_conn, device, width, height, fps, enumerate_records, on_top),
+            args=(
+                child_conn, device, width, height, fps, enumerate_records,
+                on_top, decim, codec, display_fps, encoder, capture_fourcc,
+                cpu_affinity
+            ),
         )
 
         # start server process
@@ -519,6 +1170,11 @@ class RTVideoPlayer:
     @staticmethod
     def _server_main(*args):
         """Process function"""
+        # the recorder threads wait for the GIL after every blocking call:
+        # switching more often reduces the jitter of the frame timestamps
+        # when the GUI thread is busy
+        sys.setswitchinterval(0.001)
+
         vp = RTVideoPlayerServer(*args)
         # start threads
         vp.start()
@@ -527,7 +1183,7 @@ class RTVideoPlayer:
 
     def set_auto_enum_files(self, val: bool):
         """Enable or disable auto enumeration of recording files."""
-        self._conn.send(('autoenum', {val}))
+        self._conn.send(('autoenum', val))
 
     def set_filename(self, filename: str):
         """Set file name for recordings."""
@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
 import ipywidgets as widgets
 from ipywidgets import HBox, VBox
 from IPython.display import display
@@ -5,29 +10,60 @@ from IPython.display import display
 
 class DataPlayerWidgetView:
 
+    # delay (seconds) after the last slider movement before seeking
+    SEEK_DEBOUNCE = 0.05
+    # minimum time (seconds) between two slider updates from the player
+    SLIDER_UPDATE_INTERVAL = 1 / 30
+
     def __init__(self, player, max_idx):
         self._player = player
 
+        # handle of the scheduled seek (slider movements are debounced)
+        self._pending_seek = None
+
+        # slider updates from the player are throttled: the last value wins
+        self._slider_lock = threading.Lock()
+        self._pending_slider_val = None
+        self._last_slider_push = 0.0
+        # set while a delayed update is scheduled
+        self._slider_timer = None
+        # set while the slider is moved programmatically
+        self._suspended = False
+
         self._slider = widgets.IntSlider(
             value=self._player.ptr,
             min=0,
             max=max_idx,
-            layout=widgets.Layout(width='98%'),
+            layout=widgets.Layout(width='98%', grid_area='slider'),
             # continuous_update=False
         )
 
-        beginning = widgets.Button(icon='fast-backward')
-        end = widgets.Button(icon='fast-forward')
+        # controls are placed in the areas of a single grid
+        beginning = widgets.Button(
+            icon='fast-backward', layout=widgets.Layout(grid_area='beginning')
+        )
+        end = widgets.Button(
+            icon='fast-forward', layout=widgets.Layout(grid_area='end')
+        )
 
-        backward = widgets.Button(icon='step-backward')
-        forward = widgets.Button(icon='step-forward')
+        backward = widgets.Button(
+            icon='step-backward', layout=widgets.Layout(grid_area='backward')
+        )
+        forward = widgets.Button(
+            icon='step-forward', layout=widgets.Layout(grid_area='forward')
+        )
 
-        pause = widgets.Button(icon='pause')
-        play = widgets.Button(icon='play')
+        pause = widgets.Button(
+            icon='pause', layout=widgets.Layout(grid_area='pause')
+        )
+        play = widgets.Button(
+            icon='play', layout=widgets.Layout(grid_area='play')
+        )
 
         rate = widgets.FloatText(
             value=self._player.rate,
             description='Rate:',
+            layout=widgets.Layout(grid_area='rate')
         )
 
         self.record_button = widgets.ToggleButton(
@@ -57,13 +93,31 @@ class DataPlayerWidgetView:
             value='WAV'
         )
 
-        self._widget = VBox([
-            self._slider,
-            HBox([beginning, backward, pause, play, forward, end]),
-            rate,
-            HBox([self.record_button, self.record_output, self.record_overwrite]),
-            HBox([self.export_button, self.export_output, self.export_format])
-        ])
+        self._widget = widgets.GridBox(
+            children=[
+                self._slider,
+                beginning, backward, pause, play, forward, end,
+                rate,
+                HBox(
+                    [self.record_button, self.record_output, self.record_overwrite],
+                    layout=widgets.Layout(grid_area='record')
+                ),
+                HBox(
+                    [self.export_button, self.export_output, self.export_format],
+                    layout=widgets.Layout(grid_area='export')
+                )
+            ],
+            layout=widgets.Layout(
+                grid_template_columns='repeat(6, max-content) auto',
+                grid_template_areas='''
+                    "slider slider slider slider slider slider slider"
+                    "beginning backward pause play forward end ."
+                    "rate rate rate rate rate rate ."
+                    "record record record record record record record"
+                    "export export export export export export export"
+                '''
+            )
+        )
 
         # bind callbacks
         self._slider.observe(self._on_change, 'value')
@@ -86,15 +140,44 @@ class DataPlayerWidgetView:
         display(self._widget)
 
     def update_slider(self, value):
-        """Update slider without triggering any callback."""
+        """Update slider without triggering any callback.
+
+        Updates closer than SLIDER_UPDATE_INTERVAL are coalesced: only the
+        last value is sent to the frontend.
+        """
         assert 0 <= value <= self._slider.max
 
-        # unobserve callback
-        self._slider.unobserve(self._on_change, 'value')
-        # update
-        self._slider.value = value
-        # observe again
-        self._slider.observe(self._on_change, 'value')
+        with self._slider_lock:
+            self._pending_slider_val = value
+
+            if self._slider_timer is not None:
+                # the scheduled update will display this value
+                return
+
+            delay = self._last_slider_push + self.SLIDER_UPDATE_INTERVAL - time.monotonic()
+            if delay > 0:
+                self._slider_timer = threading.Timer(delay, self._flush_slider)
+                self._slider_timer.start()
+                return
+
+        self._flush_slider()
+
+    def _flush_slider(self):
+        with self._slider_lock:
+            self._slider_timer = None
+            self._last_slider_push = time.monotonic()
+
+            with self._silent():
+                self._slider.value = self._pending_slider_val
+
+    @contextmanager
+    def _silent(self):
+        """Ignore slider changes made within the context."""
+        self._suspended = True
+        try:
+            yield
+        finally:
+            self._suspended = False
 
     def update_slider_max(self, value):
         """Change maximum value of the slider.
@@ -104,14 +187,52 @@ class DataPlayerWidgetView:
         self._slider.max = value
 
     def _on_change(self, value):
+        if self._suspended:
+            return
+
+        # while the slider is dragged, only seek where it rests
+        self._cancel_seek()
+
+        if value['new'] == self._player.ptr:
+            # already there
+            return
+
+        try:
+            # callbacks run in the kernel event loop
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no loop in this thread
+            self._pending_seek = threading.Timer(
+                self.SEEK_DEBOUNCE, self._seek, (value['new'],)
+            )
+            self._pending_seek.start()
+        else:
+            self._pending_seek = loop.call_later(
+                self.SEEK_DEBOUNCE, self._seek, value['new']
+            )
+
+    def _cancel_seek(self):
+        if self._pending_seek is not None:
+            self._pending_seek.cancel()
+            self._pending_seek = None
+
+    def _seek(self, idx):
+        self._pending_seek = None
         # seek index
-        self._player.seek(value['new'])
+        self._player.seek(idx)
+
+    def _seek_now(self, idx):
+        """Move slider and seek, without debouncing."""
+        idx = min(max(idx, 0), self._slider.max)
+        self._cancel_seek()
+        self.update_slider(idx)
+        self._player.seek(idx)
 
     def _on_beginning(self, button):
-        self._slider.value = 0
+        self._seek_now(0)
 
     def _on_end(self, button):
-        self._slider.value = self._slider.max
+        self._seek_now(self._slider.max)
 
     def _on_pause(self, button):
         self._player.pause()
@@ -121,10 +242,10 @@ class DataPlayerWidgetView:
 
     # TODO: atomicity of the update?
     def _on_backward(self, button):
-        self._slider.value -= 10
+        self._seek_now(self._slider.value - 10)
 
     def _on_forward(self, button):
-        self._slider.value += 10
+        self._seek_now(self._slider.value + 10)
 
     def _on_rate(self, value):
         self._player.rate = value['new']
@@ -236,6 +357,9 @@ class RTDataPlayerMultiWidgetView(RTDataPlayerWidgetView):
                 description='Log',
                 icon='save'
             )
+            # index of the stream, read by the shared callback
+            log._panson_idx = len(self.stream_log_boxes)
+            log.observe(self._toggle_log_stream, 'value')
             log_output = widgets.Text(
                 value=f'{stream.name}_log.csv',
                 description='Output path:',
@@ -246,24 +370,22 @@ class RTDataPlayerMultiWidgetView(RTDataPlayerWidgetView):
             )
             self.stream_log_boxes.append(HBox([log, log_output, log_overwrite, label]))
 
-        for i, log_box in enumerate(self.stream_log_boxes):
-            log_box.children[0].observe(self._toggle_log_stream_factory(i), 'value')
-
         # add one log box for every stream to the widget of the superclass
-        self._widget = VBox([
+        # extending its children keeps the same VBox model
+        self._widget.children = (
             *self._widget.children,
             *self.stream_log_boxes,
-        ])
+        )
 
-    def _toggle_log_stream_factory(self, idx):
-        def toggle_log_stream(value):
-            if value['new']:
-                self._player.log_start_stream(
-                    idx,
-                    self.stream_log_boxes[idx].children[1].value,
-                    overwrite=self.stream_log_boxes[idx].children[2].value
-                )
-            else:
-                self._player.log_stop_stream(idx)
+    def _toggle_log_stream(self, value):
+        idx = value['owner']._panson_idx
 
-        return toggle_log_stream
+        if value['new']:
+            _, log_output, log_overwrite, _ = self.stream_log_boxes[idx].children
+            self._player.log_start_stream(
+                idx,
+                log_output.value,
+                overwrite=log_overwrite.value
+            )
+        else:
+            self._player.log_stop_stream(idx)
@@ -1,36 +1,167 @@
 import ipywidgets as widgets
+import traceback
 from abc import ABC, abstractmethod
 
+from functools import partial
 from math import log2
+from threading import Event, Lock, Thread, local
+from time import sleep
+
+
+class _WidgetUpdater:
+    """Thread updating the widgets of parameters assigned from code.
+
+    Widgets are updated at most every interval seconds, with the last value
+    assigned to their parameter. A single thread serves all the parameters.
+    """
+
+    def __init__(self, interval: float):
+        self._interval = interval
+        # (parameter, instance) pairs whose widget must be updated
+        self._pending = {}
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._thread = None
+
+    def schedule(self, parameter, instance):
+        with self._lock:
+            self._pending[parameter, id(instance)] = parameter, instance
+
+            if self._thread is None:
+                self._thread = Thread(
+                    name='widget updater', target=self._run, daemon=True
+                )
+                self._thread.start()
+
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # let the assignments of the interval accumulate
+            sleep(self._interval)
+
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            for parameter, instance in pending.values():
+                try:
+                    parameter._update_widget(instance)
+                except:
+                    # the thread serves all the parameters: keep it alive
+                    traceback.print_exc()
 
 
 class WidgetParameter(ABC):
-    """Base class for all widget parameters."""
+    """Base class for all widget parameters.
+
+    The value of the parameter is stored in the sonification object and
+    updated immediately. Assignments are reflected on the widget at most
+    every WIDGET_UPDATE_INTERVAL seconds, while changes made by the user
+    through the widget are applied as they arrive.
+    """
+
+    # descriptors are class attributes of every sonification: no __dict__
+    __slots__ = 'public_name', 'private_name', 'widget_private_name', 'description'
+
+    # minimum time (seconds) between two updates of a widget
+    WIDGET_UPDATE_INTERVAL = 0.05
 
     def __set_name__(self, owner, name):
         # save name of the descriptor
         self.public_name = name
+        # name of the value attribute in sonification object
+        # it must not look like a widget key ('__<name>_widget'), which the
+        # sonification displays
+        self.private_name = '_panson_val_' + name
         # name of widget attribute in sonification object
         self.widget_private_name = '__' + name + '_widget'
+        # label of the widgets
+        self.description = name + ':'
 
     def __get__(self, instance, owner):
-        # get widget's value
-        return getattr(instance, self.widget_private_name).value
+        if instance is None:
+            # accessed on the class
+            return self
+
+        # get value from private attribute of the instance
+        # parameters are read at every sonification step
+        try:
+            return instance.__dict__[self.private_name]
+        except (AttributeError, KeyError):
+            return getattr(instance, self.private_name)
 
     def __set__(self, instance, value):
-        # update widget atomically:
+        self.set_unchecked(instance, self._validate(value))
+
+    def set_unchecked(self, instance, value):
+        """Assign value to the parameter of instance, without validating it.
+
+        Meant for trusted loops that set parameters at a high rate, e.g.
+        ``type(self).freq.set_unchecked(self, f)``. value must already have
+        the type stored by the widget (e.g. int for IntSliderParameter).
+        """
+        if not hasattr(instance, self.widget_private_name):
+            # this is executed only the first time
+            # create widget outside the lock: it communicates with the
+            # frontend, and sonification steps should not wait for it
+            widget = self._get_ipywidget(value)
+
+            with instance._lock:
+                # the widget could have been created by another thread
+                if not hasattr(instance, self.widget_private_name):
+                    # the value, as converted by the widget
+                    setattr(instance, self.private_name, widget.value)
+                    # assign widget to the sonification instance
+                    setattr(instance, self.widget_private_name, widget)
+                    # apply changes made by the user
+                    widget.observe(partial(self._on_widget_change, instance), 'value')
+                    return
+
+        # update value atomically:
         #   blocks if a sonification step is being computed
         with instance._lock:
-            if hasattr(instance, self.widget_private_name):
-                # update widget
-                widget = getattr(instance, self.widget_private_name)
-                widget.value = value
-            else:
-                # this is executed only the first time
-                # create widget
-                widget = self._get_ipywidget(value)
-                # assign widget to the sonification instance
-                setattr(instance, self.widget_private_name, widget)
+            if getattr(instance, self.private_name) == value:
+                # nothing to update
+                return
+
+            setattr(instance, self.private_name, value)
+
+        # the widget will display the last value assigned meanwhile
+        _widget_updater.schedule(self, instance)
+
+    def _update_widget(self, instance):
+        with instance._lock:
+            widget = getattr(instance, self.widget_private_name)
+            value = getattr(instance, self.private_name)
+
+        # assign outside the lock: it communicates with the frontend and
+        # runs the observers, and sonification steps should not wait for it
+        _updating.active = True
+        try:
+            widget.value = value
+        finally:
+            _updating.active = False
+
+    def _on_widget_change(self, instance, change):
+        if change['new'] == change['old']:
+            # echo of a value that did not change
+            return
+
+        if getattr(_updating, 'active', False):
+            # echo of _update_widget: the value may be stale already
+            return
+
+        with instance._lock:
+            setattr(instance, self.private_name, change['new'])
+
+    def _validate(self, value):
+        """Return value converted as the widget would store it.
+
+        Raise ValueError if value cannot be assigned to the parameter.
+        """
+        return value
 
     @abstractmethod
     def _get_ipywidget(self, value):
@@ -38,8 +169,15 @@ class WidgetParameter(ABC):
         pass
 
 
+_widget_updater = _WidgetUpdater(WidgetParameter.WIDGET_UPDATE_INTERVAL)
+# set while a thread assigns a widget value on behalf of its parameter
+_updating = local()
+
+
 class IntSliderParameter(WidgetParameter):
 
+    __slots__ = 'min', 'max', 'step'
+
     def __init__(self, min, max, step=1):
         if min >= max:
             raise ValueError(f'min ({min}) cannot be >= max ({max}).')
@@ -48,12 +186,12 @@ class IntSliderParameter(WidgetParameter):
 
         self.step = step
 
-    def __set__(self, instance, value):
+    def _validate(self, value):
         if not (self.min <= value <= self.max):
             raise ValueError(
                 f"value ({value}) must be between min ({self.min}) and max ({self.max})."
             )
-        super().__set__(instance, value)
+        return int(value)
 
     def _get_ipywidget(self, value):
         return widgets.IntSlider(
@@ -61,13 +199,15 @@ class IntSliderParameter(WidgetParameter):
             min=self.min,
             max=self.max,
             step=self.step,
-            description=self.public_name + ':',
+            description=self.description,
             layout=widgets.Layout(width='98%')
         )
 
 
 class FloatSliderParameter(WidgetParameter):
 
+    __slots__ = 'min', 'max', 'step'
+
     def __init__(self, min, max, step=0.1):
         if min >= max:
             raise ValueError(f'min ({min}) cannot be >= max ({max}).')
@@ -76,12 +216,12 @@ class FloatSliderParameter(WidgetParameter):
 
         self.step = step
 
-    def __set__(self, instance, value):
+    def _validate(self, value):
         if not (self.min <= value <= self.max):
             raise ValueError(
                 f"value ({value}) must be between min ({self.min}) and max ({self.max})."
             )
-        super().__set__(instance, value)
+        return float(value)
 
     def _get_ipywidget(self, value):
         return widgets.FloatSlider(
@@ -89,25 +229,31 @@ class FloatSliderParameter(WidgetParameter):
             min=self.min,
             max=self.max,
             step=self.step,
-            description=self.public_name + ':',
+            description=self.description,
             layout=widgets.Layout(width='98%')
         )
 
 
 class DbSliderParameter(FloatSliderParameter):
 
+    __slots__ = ()
+
     def __init__(self, step=0.1):
         super().__init__(-90, 0, step)
 
 
 class MidiSliderParameter(FloatSliderParameter):
 
+    __slots__ = ()
+
     def __init__(self, step=1):
         super().__init__(0, 127, step)
 
 
 class FloatLogSliderParameter(WidgetParameter):
 
+    __slots__ = 'min_exp', 'max_exp', 'step', 'base', '_min_val', '_max_val'
+
     def __init__(self, min_exp, max_exp, step=0.2, base=10):
         if min_exp >= max_exp:
             raise ValueError(f'min_exp ({min_exp}) cannot be >= max_exp ({max_exp}).')
@@ -117,12 +263,16 @@ class FloatLogSliderParameter(WidgetParameter):
         self.step = step
         self.base = base
 
-    def __set__(self, instance, value):
-        if not (self.base ** self.min_exp <= value <= self.base ** self.max_exp):
+        # range of the values
+        self._min_val = base ** min_exp
+        self._max_val = base ** max_exp
+
+    def _validate(self, value):
+        if not (self._min_val <= value <= self._max_val):
             raise ValueError(
-                f"value ({value}) must be between min ({self.base ** self.min_exp}) and max ({self.base ** self.max_exp})."
+                f"value ({value}) must be between min ({self._min_val}) and max ({self._max_val})."
             )
-        super().__set__(instance, value)
+        return float(value)
 
     def _get_ipywidget(self, value):
         return widgets.FloatLogSlider(
@@ -131,19 +281,30 @@ class FloatLogSliderParameter(WidgetParameter):
             min=self.min_exp,
             max=self.max_exp,
             step=self.step,
-            description=self.public_name + ':',
+            description=self.description,
             layout=widgets.Layout(width='98%')
         )
 
 
+# exponents of the default audible frequency range
+_LOG2_20 = log2(20)
+_LOG2_20000 = log2(20000)
+
+
 class FreqSliderParameter(FloatLogSliderParameter):
 
+    __slots__ = ()
+
     def __init__(self, min_freq=20, max_freq=20000, step=0.2):
-        super().__init__(log2(min_freq), log2(max_freq), step=step, base=2)
+        min_exp = _LOG2_20 if min_freq == 20 else log2(min_freq)
+        max_exp = _LOG2_20000 if max_freq == 20000 else log2(max_freq)
+        super().__init__(min_exp, max_exp, step=step, base=2)
 
 
 class IntRangeSliderParameter(WidgetParameter):
 
+    __slots__ = 'min', 'max', 'step'
+
     def __init__(self, min, max, step=1):
         if min >= max:
             raise ValueError(f'min ({min}) cannot be >= max ({max}).')
@@ -152,7 +313,7 @@ class IntRangeSliderParameter(WidgetParameter):
 
         self.step = step
 
-    def __set__(self, instance, value):
+    def _validate(self, value):
         if not (self.min <= value[0] <= self.max):
             raise ValueError(
                 f"value[0] ({value[0]}) must be between min ({self.min}) and max ({self.max})."
@@ -161,7 +322,7 @@ class IntRangeSliderParameter(WidgetParameter):
             raise ValueError(
                 f"value[1] ({value[1]}) must be between min ({self.min}) and max ({self.max})."
             )
-        super().__set__(instance, value)
+        return int(value[0]), int(value[1])
 
     def _get_ipywidget(self, value):
         return widgets.IntRangeSlider(
@@ -169,12 +330,14 @@ class IntRangeSliderParameter(WidgetParameter):
             min=self.min,
             max=self.max,
             step=self.step,
-            description=self.public_name + ':',
+            description=self.description,
         )
 
 
 class FloatRangeSliderParameter(WidgetParameter):
 
+    __slots__ = 'min', 'max', 'step'
+
     def __init__(self, min, max, step=0.1):
         if min >= max:
             raise ValueError(f'min_exp ({min}) cannot be >= max_exp ({max}).')
@@ -183,7 +346,7 @@ class FloatRangeSliderParameter(WidgetParameter):
 
         self.step = step
 
-    def __set__(self, instance, value):
+    def _validate(self, value):
         if not (self.min <= value[0] <= self.max):
             raise ValueError(
                 f"value[0] ({value[0]}) must be between min ({self.min}) and max ({self.max})."
@@ -192,7 +355,7 @@ class FloatRangeSliderParameter(WidgetParameter):
             raise ValueError(
                 f"value[1] ({value[1]}) must be between min ({self.min}) and max ({self.max})."
             )
-        super().__set__(instance, value)
+        return float(value[0]), float(value[1])
 
     def _get_ipywidget(self, value):
         return widgets.FloatRangeSlider(
@@ -200,52 +363,60 @@ class FloatRangeSliderParameter(WidgetParameter):
             min=self.min,
             max=self.max,
             step=self.step,
-            description=self.public_name + ':'
+            description=self.description
         )
 
 
 class SelectionParameter(WidgetParameter, ABC):
     """Base class for all selection widget parameters."""
 
+    __slots__ = 'options',
+
     def __init__(self, options):
         self.options = options
 
-    def __set__(self, instance, value):
+    def _validate(self, value):
         if not (value in self.options):
             raise ValueError(
                 f"value ({value}) must be between {self.options}."
             )
-        super().__set__(instance, value)
+        return value
 
 
 class DropdownParameter(SelectionParameter):
 
+    __slots__ = ()
+
     def _get_ipywidget(self, value):
         return widgets.Dropdown(
             value=value,
             options=self.options,
-            description=self.public_name + ':'
+            description=self.description
         )
 
 
 class SelectParameter(SelectionParameter):
 
+    __slots__ = ()
+
     def _get_ipywidget(self, value):
         return widgets.Select(
             value=value,
             options=self.options,
-            description=self.public_name + ':'
+            description=self.description
         )
 
 
 class ComboboxParameter(SelectionParameter):
 
+    __slots__ = ()
+
     def _get_ipywidget(self, value):
         return widgets.Combobox(
             value=value,
             placeholder='Choose option',
             options=self.options,
-            description=self.public_name + ':',
+            description=self.description,
             ensure_option=True
         )
 
@@ -253,16 +424,20 @@ class ComboboxParameter(SelectionParameter):
 class BooleanParameter(WidgetParameter, ABC):
     """Base class for all boolean widget parameters."""
 
-    def __set__(self, instance, value):
-        if type(value) != bool:
+    __slots__ = ()
+
+    def _validate(self, value):
+        if value is not True and value is not False:
             raise ValueError(
                 f"value ({value}) must be a boolean: got a {type(value)}."
             )
-        super().__set__(instance, value)
+        return value
 
 
 class ToggleButtonParameter(BooleanParameter):
 
+    __slots__ = ()
+
     def _get_ipywidget(self, value):
         return widgets.ToggleButton(
             value=value,
@@ -272,6 +447,8 @@ class ToggleButtonParameter(BooleanParameter):
 
 class CheckboxParameter(BooleanParameter):
 
+    __slots__ = ()
+
     def _get_ipywidget(self, value):
         return widgets.Checkbox(
             value=value,